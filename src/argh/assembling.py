@@ -14,7 +14,8 @@ Assembling
 Functions and classes to properly assemble your commands in a parser.
 """
 import warnings
-from collections import OrderedDict
+from collections import Counter
+from weakref import WeakKeyDictionary
 
 from argh.completion import COMPLETION_ENABLED
 from argh.constants import (
@@ -27,7 +28,7 @@ from argh.constants import (
     PARSER_FORMATTER,
 )
 from argh.exceptions import AssemblingError
-from argh.utils import get_arg_spec, get_subparsers
+from argh.utils import clear_arg_spec_cache, get_cached_arg_spec, get_subparsers
 
 __all__ = [
     "SUPPORTS_ALIASES",
@@ -50,71 +51,146 @@ SUPPORTS_ALIASES = True
 """
 
 
+# TODO: remove in v.0.30.
+# deprecated arguments of add_commands(): (name, replacement, key in group_kwargs)
+_DEPRECATED_ADD_COMMANDS_ARGS = (
+    ("namespace", "group_name", None),
+    ("namespace_kwargs", "group_kwargs", None),
+    ("title", "parser_kwargs", "description"),
+    ("help", "parser_kwargs", "help"),
+    ("description", "parser_kwargs", "description"),
+)
+_DEPRECATED_ADD_COMMANDS_ARG_MESSAGE = (
+    "Argument `{name}` is deprecated in add_commands(), "
+    "it will be removed in Argh 0.30. "
+    "Please use `{replacement}` instead."
+)
+
+
+class _ArgSpec:
+    # An argument inferred from the function signature (possibly refined by
+    # an @arg declaration).  It is turned into a regular argument declaration,
+    # i.e. a dict as stored by the @arg decorator, only right before being
+    # added to the parser.
+    __slots__ = ("option_strings", "kwargs", "positional")
+
+    def __init__(self, option_strings, kwargs, positional):
+        self.option_strings = option_strings
+        self.kwargs = kwargs
+        self.positional = positional
+
+    @classmethod
+    def from_declaration(cls, declaration, positional):
+        kwargs = declaration.copy()
+        option_strings = kwargs.pop("option_strings")
+        return cls(option_strings, kwargs, positional)
+
+    def merged(self, declaration):
+        # a copy with an explicit argument declaration merged into it
+        # (the inferred specs are cached and must stay intact)
+        kwargs = dict(self.kwargs, **declaration)
+        option_strings = kwargs.pop("option_strings")
+        return _ArgSpec(option_strings, kwargs, self.positional)
+
+    def to_dict(self):
+        return dict(self.kwargs, option_strings=self.option_strings)
+
+
+# inferred arguments keyed on the function object; entries are dropped
+# along with the functions themselves
+_INFERRED_ARGS_CACHE = WeakKeyDictionary()
+
+
+def _get_cached(cache, function, compute):
+    try:
+        return cache[function]
+    except KeyError:
+        value = cache[function] = compute(function)
+        return value
+    except TypeError:
+        # the callable is unhashable or cannot be weakly referenced
+        return compute(function)
+
+
+def _clear_introspection_caches():
+    # needed if the signature of a function is modified in place (e.g. its
+    # `__defaults__`) after it has already been turned into a command
+    clear_arg_spec_cache()
+    _INFERRED_ARGS_CACHE.clear()
+
+
+def _get_inferred_args(function):
+    return _get_cached(
+        _INFERRED_ARGS_CACHE,
+        function,
+        lambda f: tuple(_get_args_from_signature(f)),
+    )
+
+
 def _get_args_from_signature(function):
     if getattr(function, ATTR_EXPECTS_NAMESPACE_OBJECT, False):
         return
 
-    spec = get_arg_spec(function)
+    spec = get_cached_arg_spec(function)
 
     defaults = dict(zip(*[reversed(x) for x in (spec.args, spec.defaults or [])]))
     defaults.update(getattr(spec, "kwonlydefaults", None) or {})
 
     kwonly = getattr(spec, "kwonlyargs", [])
+    all_args = spec.args + kwonly
 
-    annotations = dict(
-        (k, v) for k, v in function.__annotations__.items() if isinstance(v, str)
-    )
+    # TODO: remove this in v.0.30.
+    annotations = function.__annotations__
+    has_str_annotations = any(isinstance(annotations.get(x), str) for x in all_args)
+    if has_str_annotations:
+        warnings.warn(
+            "Defining argument help messages via annotations is "
+            + "deprecated and will be removed in Argh 0.30.  Please "
+            + 'replace `f(a:"foo")` with `@arg("-a", help="foo")(a)`.',
+            DeprecationWarning,
+        )
 
     # define the list of conflicting option strings
     # (short forms, i.e. single-character ones)
-    named_args = set(list(defaults) + kwonly)
-    named_arg_chars = [a[0] for a in named_args]
-    named_arg_char_counts = dict(
-        (char, named_arg_chars.count(char)) for char in set(named_arg_chars)
-    )
-    conflicting_opts = tuple(
-        char for char in named_arg_char_counts if 1 < named_arg_char_counts[char]
+    named_args = set(defaults).union(kwonly)
+    named_arg_char_counts = Counter(a[0] for a in named_args)
+    conflicting_opts = frozenset(
+        char for char, count in named_arg_char_counts.items() if 1 < count
     )
 
-    for name in spec.args + kwonly:
-        flags = []  # name_or_flags
+    for name in all_args:
+        flags = ()  # name_or_flags
         akwargs = {}  # keyword arguments for add_argument()
 
         # TODO: remove this in v.0.30.
-        if name in annotations:
+        if has_str_annotations:
             # help message:  func(a : "b")  ->  add_argument("a", help="b")
             value = annotations.get(name)
             if isinstance(value, str):
-                warnings.warn(
-                    "Defining argument help messages via annotations is "
-                    + "deprecated and will be removed in Argh 0.30.  Please "
-                    + 'replace `f(a:"foo")` with `@arg("-a", help="foo")(a)`.',
-                    DeprecationWarning,
-                )
-                akwargs.update(help=value)
+                akwargs["help"] = value
 
-        if name in defaults or name in kwonly:
+        if name in named_args:
             if name in defaults:
-                akwargs.update(default=defaults.get(name))
+                akwargs["default"] = defaults[name]
             else:
-                akwargs.update(required=True)
-            flags = ("-{0}".format(name[0]), "--{0}".format(name))
-            if name.startswith(conflicting_opts):
-                # remove short name
-                flags = flags[1:]
+                akwargs["required"] = True
+            # cmd(foo_bar=1)  ->  add_argument('-f', '--foo-bar')
+            long_flag = "--" + name.replace("_", "-")
+            if name[0] in conflicting_opts:
+                # omit short name
+                flags = (long_flag,)
+            else:
+                flags = ("-" + name[0].replace("_", "-"), long_flag)
 
         else:
             # positional argument
             flags = (name,)
 
-        # cmd(foo_bar)  ->  add_argument('foo-bar')
-        flags = tuple(x.replace("_", "-") if x.startswith("-") else x for x in flags)
-
-        yield dict(option_strings=flags, **akwargs)
+        yield _ArgSpec(flags, akwargs, positional=name not in named_args)
 
     if spec.varargs:
         # *args
-        yield dict(option_strings=[spec.varargs], nargs="*")
+        yield _ArgSpec((spec.varargs,), {"nargs": "*"}, positional=True)
 
 
 def _guess(kwargs):
@@ -122,6 +198,9 @@ def _guess(kwargs):
     Adds types, actions, etc. to given argument specification.
     For example, ``default=3`` implies ``type=int``.
 
+    The given specification is not modified; if nothing could be guessed,
+    it is returned as is.
+
     :param arg: a :class:`argh.utils.Arg` instance
     """
     guessed = {}
@@ -143,40 +222,35 @@ def _guess(kwargs):
                 guessed["type"] = type(value)
 
     # guess type from choices (first item)
-    if kwargs.get("choices") and "type" not in list(guessed) + list(kwargs):
+    if kwargs.get("choices") and "type" not in guessed and "type" not in kwargs:
         guessed["type"] = type(kwargs["choices"][0])
 
-    return dict(kwargs, **guessed)
+    if not guessed:
+        return kwargs
+
+    kwargs = kwargs.copy()
+    kwargs.update(guessed)
+    return kwargs
 
 
 def _is_positional(args, prefix_chars="-"):
     if not args or not args[0]:
         raise ValueError("Expected at least one argument")
-    if args[0][0].startswith(tuple(prefix_chars)):
-        return False
-    else:
-        return True
+    return args[0][0] not in prefix_chars
 
 
-def _get_parser_param_kwargs(parser, argspec):
-    argspec = argspec.copy()  # parser methods modify source data
-    args = argspec["option_strings"]
-
-    if _is_positional(args, prefix_chars=parser.prefix_chars):
-        get_kwargs = parser._get_positional_kwargs
+def _fast_dest(args, prefix_chars="-", positional=None):
+    # Derives "dest" from option strings the same way as argparse does in
+    # ArgumentParser._get_optional_kwargs(), minus the validation.
+    if positional is None:
+        positional = _is_positional(args, prefix_chars=prefix_chars)
+    if positional:
+        dest = args[0]
     else:
-        get_kwargs = parser._get_optional_kwargs
-
-    kwargs = get_kwargs(*args, **argspec)
-
-    kwargs["dest"] = kwargs["dest"].replace("-", "_")
-
-    return kwargs
-
-
-def _get_dest(parser, argspec):
-    kwargs = _get_parser_param_kwargs(parser, argspec)
-    return kwargs["dest"]
+        # the first long option string (if any) defines the "dest"
+        dest = next((x for x in args if 1 < len(x) and x[1] in prefix_chars), args[0])
+        dest = dest.lstrip(prefix_chars)
+    return dest.replace("-", "_")
 
 
 def set_default_command(parser, function):
@@ -200,10 +274,12 @@ def set_default_command(parser, function):
        option name ``-h`` is silently removed from any argument.
 
     """
-    spec = get_arg_spec(function)
+    spec = get_cached_arg_spec(function)
 
     declared_args = getattr(function, ATTR_ARGS, [])
-    inferred_args = list(_get_args_from_signature(function))
+    inferred_args = _get_inferred_args(function)
+
+    prefix_chars = parser.prefix_chars
 
     if inferred_args and declared_args:
         # We've got a mixture of declared and inferred arguments
@@ -215,19 +291,40 @@ def set_default_command(parser, function):
         #     '-f', '--foo' → 'foo'
         #     'foo-bar'     → 'foo_bar'
         #
-        # * argument declaration is a dictionary representing an argument;
+        # * argument declaration is an `_ArgSpec` representing an argument;
         #   it is obtained either from _get_args_from_signature() or from
-        #   an @arg decorator (as is).
+        #   an @arg decorator.
         #
-        dests = OrderedDict()
+        dests = {}
 
         for argspec in inferred_args:
-            dest = _get_parser_param_kwargs(parser, argspec)["dest"]
+            dest = _fast_dest(
+                argspec.option_strings, prefix_chars, positional=argspec.positional
+            )
             dests[dest] = argspec
 
         for declared_kw in declared_args:
             # an argument is declared via decorator
-            dest = _get_dest(parser, declared_kw)
+            option_strings = declared_kw["option_strings"]
+            decl_positional = _is_positional(option_strings, prefix_chars=prefix_chars)
+            if not decl_positional:
+                # _fast_dest() skips the validation done by argparse
+                for option_string in option_strings:
+                    if not option_string or option_string[0] not in prefix_chars:
+                        raise AssemblingError(
+                            "{func}: invalid option string {option!r}: "
+                            "must start with a character {prefix_chars!r}".format(
+                                func=function.__name__,
+                                option=option_string,
+                                prefix_chars=prefix_chars,
+                            )
+                        )
+            if declared_kw.get("dest"):
+                dest = declared_kw["dest"].replace("-", "_")
+            else:
+                dest = _fast_dest(
+                    option_strings, prefix_chars, positional=decl_positional
+                )
             if dest in dests:
                 # the argument is already known from function signature
                 #
@@ -238,8 +335,7 @@ def set_default_command(parser, function):
                 #      @arg('--my-bar')  maps to  func(my_bar=...)
 
                 # either both arguments are positional or both are optional
-                decl_positional = _is_positional(declared_kw["option_strings"])
-                infr_positional = _is_positional(dests[dest]["option_strings"])
+                infr_positional = dests[dest].positional
                 if decl_positional != infr_positional:
                     kinds = {True: "positional", False: "optional"}
                     raise AssemblingError(
@@ -254,17 +350,19 @@ def set_default_command(parser, function):
 
                 # merge explicit argument declaration into the inferred one
                 # (e.g. `help=...`)
-                dests[dest].update(**declared_kw)
+                dests[dest] = dests[dest].merged(declared_kw)
             else:
                 # the argument is not in function signature
                 varkw = getattr(spec, "varkw", getattr(spec, "keywords", []))
                 if varkw:
                     # function accepts **kwargs; the argument goes into it
-                    dests[dest] = declared_kw
+                    dests[dest] = _ArgSpec.from_declaration(
+                        declared_kw, positional=decl_positional
+                    )
                 else:
                     # there's no way we can map the argument declaration
                     # to function signature
-                    xs = (dests[x]["option_strings"] for x in dests)
+                    xs = (x.option_strings for x in dests.values())
                     raise AssemblingError(
                         "{func}: argument {flags} does not fit "
                         "function signature: {sig}".format(
@@ -277,21 +375,27 @@ def set_default_command(parser, function):
         # pack the modified data back into a list
         inferred_args = dests.values()
 
-    command_args = inferred_args or declared_args
+    # fresh dicts: the declarations must survive the modifications below
+    if inferred_args:
+        command_args = [argspec.to_dict() for argspec in inferred_args]
+    else:
+        command_args = [declared_kw.copy() for declared_kw in declared_args]
 
-    # add types, actions, etc. (e.g. default=3 implies type=int)
-    command_args = [_guess(x) for x in command_args]
+    add_help = parser.add_help
+    add_argument = parser.add_argument
 
-    for draft in command_args:
-        draft = draft.copy()
-        if "help" not in draft:
-            draft.update(help=DEFAULT_ARGUMENT_TEMPLATE)
+    for argspec in command_args:
+        # add types, actions, etc. (e.g. default=3 implies type=int)
+        draft = _guess(argspec)
+        draft.setdefault("help", DEFAULT_ARGUMENT_TEMPLATE)
         dest_or_opt_strings = draft.pop("option_strings")
-        if parser.add_help and "-h" in dest_or_opt_strings:
-            dest_or_opt_strings = [x for x in dest_or_opt_strings if x != "-h"]
+        # a single option string is either a positional or it has nothing
+        # left to fall back to, so only combined ones are cleaned up
+        if add_help and 1 < len(dest_or_opt_strings) and "-h" in dest_or_opt_strings:
+            dest_or_opt_strings = tuple(x for x in dest_or_opt_strings if x != "-h")
         completer = draft.pop("completer", None)
         try:
-            action = parser.add_argument(*dest_or_opt_strings, **draft)
+            action = add_argument(*dest_or_opt_strings, **draft)
             if COMPLETION_ENABLED and completer:
                 action.completer = completer
         except Exception as exc:
@@ -419,49 +523,37 @@ def add_commands(
     # ------------------------------------------------------------------------
     # TODO remove all of these in 0.30
     #
-    if namespace:
-        warnings.warn(
-            "Argument `namespace` is deprecated in add_commands(), "
-            + "it will be removed in Argh 0.30. "
-            + "Please use `group_name` instead.",
-            DeprecationWarning,
-        )
-        group_name = namespace
-    if namespace_kwargs:
-        warnings.warn(
-            "Argument `namespace_kwargs` is deprecated in add_commands(), "
-            + "it will be removed in Argh 0.30. "
-            + "Please use `group_kwargs` instead.",
-            DeprecationWarning,
-        )
-        group_kwargs = namespace_kwargs
-    if title:
-        warnings.warn(
-            "Argument `title` is deprecated in add_commands(), "
-            + "it will be removed in Argh 0.30. "
-            + "Please use `parser_kwargs` instead.",
-            DeprecationWarning,
-        )
-        group_kwargs["description"] = title
-    if help:
-        warnings.warn(
-            "Argument `help` is deprecated in add_commands(), "
-            + "it will be removed in Argh 0.30. "
-            + "Please use `parser_kwargs` instead.",
-            DeprecationWarning,
-        )
-        group_kwargs["help"] = help
-    if description:
-        warnings.warn(
-            "Argument `description` is deprecated in add_commands(), "
-            + "it will be removed in Argh 0.30. "
-            + "Please use `parser_kwargs` instead.",
-            DeprecationWarning,
-        )
-        group_kwargs["description"] = description
+    if namespace or namespace_kwargs or title or help or description:
+        deprecated_kwargs = {
+            "namespace": namespace,
+            "namespace_kwargs": namespace_kwargs,
+            "title": title,
+            "help": help,
+            "description": description,
+        }
+        current_kwargs = {"group_name": group_name, "group_kwargs": group_kwargs}
+        for name, replacement, group_kwargs_key in _DEPRECATED_ADD_COMMANDS_ARGS:
+            value = deprecated_kwargs[name]
+            if not value:
+                continue
+            warnings.warn(
+                _DEPRECATED_ADD_COMMANDS_ARG_MESSAGE.format(
+                    name=name, replacement=replacement
+                ),
+                DeprecationWarning,
+            )
+            if group_kwargs_key:
+                current_kwargs["group_kwargs"][group_kwargs_key] = value
+            else:
+                current_kwargs[replacement] = value
+        group_name = current_kwargs["group_name"]
+        group_kwargs = current_kwargs["group_kwargs"]
     #
     # ------------------------------------------------------------------------
 
+    # collect command names and parser kwargs before touching the parser
+    commands = [(func, _extract_command_meta_from_func(func)) for func in functions]
+
     subparsers_action = get_subparsers(parser, create=True)
 
     if group_name:
@@ -481,9 +573,7 @@ def add_commands(
         if group_kwargs:
             raise ValueError("`group_kwargs` only makes sense with `group_name`.")
 
-    for func in functions:
-        cmd_name, func_parser_kwargs = _extract_command_meta_from_func(func)
-
+    for func, (cmd_name, func_parser_kwargs) in commands:
         # override any computed kwargs by manually supplied ones
         if func_kwargs:
             func_parser_kwargs.update(func_kwargs)
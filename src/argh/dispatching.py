@@ -26,7 +26,7 @@ from argh.constants import (
     PARSER_FORMATTER,
 )
 from argh.exceptions import CommandError, DispatchingError
-from argh.utils import get_arg_spec
+from argh.utils import get_cached_arg_spec
 
 __all__ = [
     "ArghNamespace",
@@ -255,7 +255,7 @@ def _execute_command(function, namespace_obj, errors_file, pre_call=None):
             # filter the namespace variables so that only those expected
             # by the actual function will pass
 
-            spec = get_arg_spec(function)
+            spec = get_cached_arg_spec(function)
 
             positional = [all_input[k] for k in spec.args]
             kwonly = getattr(spec, "kwonlyargs", [])
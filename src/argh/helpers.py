@@ -25,18 +25,42 @@ class ArghParser(argparse.ArgumentParser):
     A subclass of :class:`argparse.ArgumentParser` with support for and a
     couple of convenience methods.
 
-    All methods are but wrappers for stand-alone functions
+    The convenience methods are but wrappers for stand-alone functions
     :func:`~argh.assembling.add_commands`,
     :func:`~argh.completion.autocomplete` and
-    :func:`~argh.dispatching.dispatch`.
+    :func:`~argh.dispatching.dispatch`.  Adding arguments also reuses the
+    help formatter which argparse creates to validate each new argument.
 
     Uses :attr:`~argh.dispatching.PARSER_FORMATTER`.
     """
 
     def __init__(self, *args, **kwargs):
         kwargs.setdefault("formatter_class", PARSER_FORMATTER)
+        # see add_argument(); set before super() adds the help argument
+        self._validation_formatter = None
+        self._validating_argument = False
         super(ArghParser, self).__init__(*args, **kwargs)
 
+    def add_argument(self, *args, **kwargs):
+        "Wrapper for :meth:`argparse.ArgumentParser.add_argument`."
+        # argparse builds a new help formatter for each argument only to check
+        # its metavar against `nargs`; the formatter is not modified by that
+        # check, so a single instance is reused for all arguments
+        self._validating_argument = True
+        try:
+            return super(ArghParser, self).add_argument(*args, **kwargs)
+        finally:
+            self._validating_argument = False
+
+    def _get_formatter(self, *args, **kwargs):
+        # a formatter requested with extra arguments (possible in newer
+        # versions of argparse) may differ from the cached one
+        if not self._validating_argument or args or kwargs:
+            return super(ArghParser, self)._get_formatter(*args, **kwargs)
+        if self._validation_formatter is None:
+            self._validation_formatter = super(ArghParser, self)._get_formatter()
+        return self._validation_formatter
+
     def set_default_command(self, *args, **kwargs):
         "Wrapper for :func:`~argh.assembling.set_default_command`."
         return set_default_command(self, *args, **kwargs)
@@ -14,6 +14,10 @@ Utilities
 import argparse
 import inspect
 import re
+from weakref import WeakKeyDictionary
+
+# indentation of the first indented line; see unindent()
+_FIRST_INDENT_RE = re.compile("(^|\n)( +)")
 
 
 def get_subparsers(parser, create=False):
@@ -55,13 +59,40 @@ def get_arg_spec(function):
     return spec
 
 
+# results of get_arg_spec() keyed on the function object; entries are dropped
+# along with the functions themselves
+_ARG_SPEC_CACHE = WeakKeyDictionary()
+
+
+def get_cached_arg_spec(function):
+    """
+    Same as :func:`get_arg_spec` but the result is remembered per function.
+    """
+    try:
+        return _ARG_SPEC_CACHE[function]
+    except KeyError:
+        spec = _ARG_SPEC_CACHE[function] = get_arg_spec(function)
+        return spec
+    except TypeError:
+        # the callable is unhashable or cannot be weakly referenced
+        return get_arg_spec(function)
+
+
+def clear_arg_spec_cache():
+    """
+    Forgets the results of :func:`get_cached_arg_spec`, e.g. after the
+    signature of a function has been modified in place.
+    """
+    _ARG_SPEC_CACHE.clear()
+
+
 def unindent(text):
     """
     Given a multi-line string, decreases indentation of all lines so that the
     first non-empty line has zero indentation and the remaining lines are
     adjusted accordingly.
     """
-    match = re.match("(^|\n)( +)", text)
+    match = _FIRST_INDENT_RE.match(text)
     if not match:
         return text
     first_line_indentation = match.group(2)
@@ -2,18 +2,21 @@
 Common stuff for tests
 ~~~~~~~~~~~~~~~~~~~~~~
 """
+import functools
 import io
 import os
 import sys
-from collections import namedtuple
+from contextlib import redirect_stderr, redirect_stdout
+from typing import NamedTuple, Optional, Union
 
 from argh import ArghParser
 
 
-# hacky constructor for default exit value
-def CmdResult(out, err, exit=None):
-    _CmdResult = namedtuple("CmdResult", ("out", "err", "exit"))
-    return _CmdResult(out, err, exit)
+class CmdResult(NamedTuple):
+    out: Optional[str]
+    err: str
+    # status code or message from SystemExit; `None` if it wasn't raised
+    exit: Union[int, str, None] = None
 
 
 class DebugArghParser(ArghParser):
@@ -27,7 +30,8 @@ class DebugArghParser(ArghParser):
 
 
 def call_cmd(parser, command_string, **kwargs):
-    if hasattr(command_string, "split"):
+    # a list of arguments (or `None` for ``sys.argv``) is passed as is
+    if isinstance(command_string, str):
         args = command_string.split()
     else:
         args = command_string
@@ -40,7 +44,9 @@ def call_cmd(parser, command_string, **kwargs):
     kwargs["errors_file"] = io_err
 
     try:
-        result = parser.dispatch(args, **kwargs)
+        # argparse prints help and usage directly to sys.stdout/sys.stderr
+        with redirect_stdout(io_out), redirect_stderr(io_err):
+            result = parser.dispatch(args, **kwargs)
     except SystemExit as e:
         result = None
         exit = e.code or 0  # e.code may be None
@@ -48,11 +54,9 @@ def call_cmd(parser, command_string, **kwargs):
         exit = None
 
     if kwargs.get("output_file") is None:
-        return CmdResult(out=result, err=io_err.read(), exit=exit)
+        return CmdResult(out=result, err=io_err.getvalue(), exit=exit)
     else:
-        io_out.seek(0)
-        io_err.seek(0)
-        return CmdResult(out=io_out.read(), err=io_err.read(), exit=exit)
+        return CmdResult(out=io_out.getvalue(), err=io_err.getvalue(), exit=exit)
 
 
 def run(parser, command_string, kwargs=None, exit=False):
@@ -75,5 +79,11 @@ def run(parser, command_string, kwargs=None, exit=False):
 
 
 def get_usage_string(definitions="{cmd} ..."):
-    prog = os.path.basename(sys.argv[0])
+    # ``sys.argv[0]`` is part of the key so that patching it is respected
+    return _get_usage_string(sys.argv[0], definitions)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_usage_string(argv0, definitions):
+    prog = os.path.basename(argv0)
     return "usage: " + prog + " [-h] " + definitions + "\n\n"
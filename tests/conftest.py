@@ -0,0 +1,16 @@
+"""
+Test configuration
+~~~~~~~~~~~~~~~~~~
+"""
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def disable_argparse_color():
+    # Expected help messages are plain text.  Newer versions of argparse may
+    # colorize help depending on the environment; PYTHON_COLORS takes
+    # precedence over NO_COLOR and FORCE_COLOR.
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("PYTHON_COLORS", "0")
+        monkeypatch.setenv("NO_COLOR", "1")
+        yield
@@ -18,6 +18,9 @@ def test_guess_type_from_choices():
     same = dict(option_strings=("foo",), choices=[1, 2], type="NO_MATTER_WHAT")
     assert same == argh.assembling._guess(same)
 
+    # ensure the source is not modified
+    assert old == dict(option_strings=("foo",), choices=[1, 2])
+
 
 def test_guess_type_from_default():
     old = dict(option_strings=("foo",), default=1)
@@ -292,6 +295,22 @@ def test_annotation():
     assert "quux" in prog_help
 
 
+# TODO: remove in v.0.30
+def test_annotation__warns_once_per_function():
+    def cmd(foo: "quux" = 123, bar: int = 1, baz: "fizz" = 0):  # noqa: F821
+        pass
+
+    parser = argh.ArghParser()
+
+    with pytest.warns(DeprecationWarning) as recorded_warnings:
+        parser.set_default_command(cmd)
+
+    assert len(recorded_warnings) == 1
+    prog_help = parser.format_help()
+    assert "quux" in prog_help
+    assert "fizz" in prog_help
+
+
 def test_kwonlyargs():
     "Correctly processing required and optional keyword-only arguments"
 
@@ -404,6 +423,24 @@ def test_arghparser_autocomplete_method(mock_autocomplete):
     mock_autocomplete.assert_called()
 
 
+def test_validation_formatter_is_reused():
+    parser = argh.ArghParser()
+    formatter_class = MagicMock(wraps=parser.formatter_class)
+    parser.formatter_class = formatter_class
+
+    # the formatter created for the implicit -h argument is reused
+    parser.add_argument("--foo", metavar="FOO")
+    parser.add_argument("--bar", nargs=2, metavar=("A", "B"))
+    assert formatter_class.call_count == 0
+
+    with pytest.raises(ValueError, match="length of metavar tuple"):
+        parser.add_argument("--quux", nargs=2, metavar=("A", "B", "C"))
+
+    # help is still rendered with a fresh formatter
+    assert "--foo FOO" in parser.format_help()
+    assert formatter_class.call_count == 1
+
+
 def test_is_positional():
     with pytest.raises(ValueError, match="Expected at least one"):
         argh.assembling._is_positional([])
@@ -418,3 +455,142 @@ def test_is_positional():
     # this spec is invalid but validation is out of scope of the function
     # as it only checks if the first argument has the leading dash
     assert argh.assembling._is_positional(["-f", "foo"]) is False
+
+
+def test_introspection_is_cached_per_function():
+    def func(foo, bar=1):
+        pass
+
+    with patch(
+        "argh.utils.get_arg_spec", wraps=argh.utils.get_arg_spec
+    ) as mock_get_arg_spec:
+        argh.ArghParser().set_default_command(func)
+        argh.ArghParser().set_default_command(func)
+
+    assert mock_get_arg_spec.mock_calls == [call(func)]
+
+    # the cached specs are not affected by merging with declared ones
+    argh.arg("--bar", help="baz")(func)
+    p = argh.ArghParser()
+    p.set_default_command(func)
+    assert "baz" in p.format_help()
+    assert [x.to_dict() for x in argh.assembling._get_inferred_args(func)] == [
+        dict(option_strings=("foo",)),
+        dict(option_strings=("-b", "--bar"), default=1),
+    ]
+
+
+def test_introspection_of_non_weakrefable_callable():
+    class Command:
+        __slots__ = ()
+        __annotations__ = {}
+
+        @staticmethod
+        def __call__(foo):
+            return foo
+
+    func = Command()
+    p = argh.ArghParser()
+    p.set_default_command(func)
+
+    assert p.parse_args(["x"]).foo == "x"
+
+
+def test_fast_dest():
+    fast_dest = argh.assembling._fast_dest
+    assert fast_dest(["foo"]) == "foo"
+    assert fast_dest(["foo-bar"]) == "foo_bar"
+    assert fast_dest(["-f"]) == "f"
+    assert fast_dest(["-f", "--foo-bar"]) == "foo_bar"
+    assert fast_dest(["--foo", "--bar"]) == "foo"
+    assert fast_dest(["+f", "++foo"], prefix_chars="+") == "foo"
+    with pytest.raises(ValueError, match="Expected at least one"):
+        fast_dest([])
+
+
+def test_set_default_command_explicit_dest():
+    @argh.arg("-q", "--quux", dest="foo_bar", help="explicit dest")
+    def func(foo_bar=1):
+        return foo_bar
+
+    parser = argh.ArghParser()
+    parser.add_argument = MagicMock()
+
+    argh.set_default_command(parser, func)
+
+    assert parser.add_argument.mock_calls == [
+        call("-q", "--quux", default=1, dest="foo_bar", help="explicit dest", type=int),
+    ]
+
+
+def test_command_meta_follows_later_decoration():
+    def func():
+        "docstring"
+
+    first = argh.ArghParser()
+    first.add_commands([func], func_kwargs={"help": "override"})
+
+    # decorated in place after having been used as a command
+    argh.aliases("ali")(func)
+    argh.named("renamed")(func)
+
+    second = argh.ArghParser()
+    second.add_commands([func])
+
+    assert argh.assembling._extract_command_meta_from_func(func) == (
+        "renamed",
+        {
+            "help": "docstring",
+            "formatter_class": argh.constants.PARSER_FORMATTER,
+            "aliases": ("ali",),
+        },
+    )
+    assert "override" in first.format_help()
+    assert "renamed" in second.format_help()
+    assert second.parse_args(["ali"]).get_function() is func
+
+
+def test_clear_introspection_caches():
+    def func(foo=1):
+        return foo
+
+    argh.ArghParser().set_default_command(func)
+
+    # signature modified in place after having been used as a command
+    func.__defaults__ = ("x",)
+    assert argh.utils.get_cached_arg_spec(func).defaults == (1,)
+
+    argh.assembling._clear_introspection_caches()
+    assert argh.utils.get_cached_arg_spec(func).defaults == ("x",)
+    p = argh.ArghParser()
+    p.set_default_command(func)
+    assert p.parse_args([]).foo == "x"
+
+
+def test_set_default_command_keeps_declared_args_intact():
+    @argh.arg("foo", help="not guessed")
+    @argh.arg("--bar", default=1)
+    def func(**kwargs):
+        pass
+
+    declared_args = [
+        dict(option_strings=("foo",), help="not guessed"),
+        dict(option_strings=("--bar",), default=1),
+    ]
+    assert getattr(func, argh.constants.ATTR_ARGS) == declared_args
+
+    argh.ArghParser().set_default_command(func)
+    argh.ArghParser().set_default_command(func)
+
+    assert getattr(func, argh.constants.ATTR_ARGS) == declared_args
+
+
+def test_set_default_command_custom_prefix_chars():
+    @argh.arg("+q", "--quiet", help="be quiet")
+    def func(quiet=False):
+        return quiet
+
+    p = argh.ArghParser(prefix_chars="-+")
+    p.set_default_command(func)
+
+    assert p.parse_args(["+q"]).quiet is True
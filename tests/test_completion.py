@@ -47,3 +47,17 @@ def test_disabled_with_bash(mock_logger, mock_getenv, mock_argcomplete):
     mock_logger.debug.assert_called_with(
         "Bash completion is not available. Please install argcomplete."
     )
+
+
+@patch("argh.completion.COMPLETION_ENABLED", False)
+@patch("argh.completion.os.getenv")
+def test_disabled_with_bash__logger(mock_getenv, caplog):
+    mock_getenv.return_value = "/bin/bash"
+    parser = argh.ArghParser()
+
+    with caplog.at_level("DEBUG", logger="argh"):
+        parser.autocomplete()
+
+    assert caplog.messages == [
+        "Bash completion is not available. Please install argcomplete."
+    ]
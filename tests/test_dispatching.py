@@ -114,3 +114,19 @@ def test_entrypoint(ap_cls_mock, add_commands_mock, dispatch_mock):
     add_commands_mock.assert_called_with(mocked_parser, [greet, hit])
     assert dispatch_mock.called
     dispatch_mock.assert_called_with(mocked_parser)
+
+
+def test_dispatch_reuses_introspection_results():
+    def func(foo, bar=1):
+        return foo
+
+    parser = argh.ArghParser()
+
+    with patch(
+        "argh.utils.get_arg_spec", wraps=argh.utils.get_arg_spec
+    ) as mock_get_arg_spec:
+        parser.set_default_command(func)
+        parser.dispatch(["x"], output_file=None)
+        parser.dispatch(["y"], output_file=None)
+
+    mock_get_arg_spec.assert_called_once_with(func)
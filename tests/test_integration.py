@@ -5,21 +5,58 @@ Integration Tests
 import argparse
 import re
 import sys
-import unittest.mock as mock
+from typing import Final
 
 import pytest
 
 import argh
+from argh.assembling import SUPPORTS_ALIASES
 from argh.exceptions import AssemblingError
 from argh.utils import unindent
 
 from .base import CmdResult as R
 from .base import DebugArghParser, get_usage_string, run
 
-if sys.version_info < (3, 10):
-    HELP_OPTIONS_LABEL = "optional arguments"
-else:
-    HELP_OPTIONS_LABEL = "options"
+HELP_OPTIONS_LABEL: Final[str] = (
+    "optional arguments" if sys.version_info < (3, 10) else "options"
+)
+
+# TODO: remove in v.0.30
+_DEPRECATED_NAMESPACE_RE = re.compile(
+    r"Argument `namespace` is deprecated .+ it will be removed in Argh 0\.30"
+    r".+ use `group_name` instead"
+)
+_DEPRECATED_NAMESPACE_KWARGS_RE = re.compile(
+    r"Argument `namespace_kwargs` is deprecated .+ it will be removed in Argh 0\.30"
+    r".+ use `group_kwargs` instead"
+)
+
+
+#
+# Plain commands shared by several tests; tests that decorate or mutate
+# a function still define their own copy
+#
+
+
+def echo(text):
+    return "you said {0}".format(text)
+
+
+def hello(name="world"):
+    return "Hello {0}!".format(name or "world")
+
+
+def howdy(buddy):
+    return "Howdy {0}?".format(buddy)
+
+
+def first_func(foo=123):
+    """Owl stretching time"""
+    return foo
+
+
+def second_func():
+    pass
 
 
 def test_set_default_command_integration():
@@ -52,50 +89,56 @@ def test_set_default_command_integration_merging():
 #
 
 
-def test_simple_function_no_args():
-    def cmd():
-        yield 1
-
-    p = DebugArghParser()
-    p.set_default_command(cmd)
+def _cmd_no_args():
+    yield 1
 
-    assert run(p, "") == R(out="1\n", err="")
 
+def _cmd_positional(x):
+    yield x
 
-def test_simple_function_positional():
-    def cmd(x):
-        yield x
 
-    p = DebugArghParser()
-    p.set_default_command(cmd)
+def _cmd_defaults(x="foo"):
+    yield x
 
-    assert run(p, "", exit=True) == "the following arguments are required: x"
-    assert run(p, "foo") == R(out="foo\n", err="")
 
+def _cmd_varargs(*file_paths):
+    # `paths` is the single positional argument with nargs='*'
+    yield ", ".join(file_paths)
 
-def test_simple_function_defaults():
-    def cmd(x="foo"):
-        yield x
 
+@pytest.mark.parametrize(
+    "cmd, argv, expected",
+    [
+        pytest.param(_cmd_no_args, "", R(out="1\n", err=""), id="no-args"),
+        pytest.param(
+            _cmd_positional,
+            "",
+            R(out="", err="", exit="the following arguments are required: x"),
+            id="positional-missing",
+        ),
+        pytest.param(_cmd_positional, "foo", R(out="foo\n", err=""), id="positional"),
+        pytest.param(_cmd_defaults, "", R(out="foo\n", err=""), id="defaults"),
+        pytest.param(
+            _cmd_defaults,
+            "bar",
+            R(out="", err="", exit="unrecognized arguments: bar"),
+            id="defaults-as-positional",
+        ),
+        pytest.param(
+            _cmd_defaults, "--x bar", R(out="bar\n", err=""), id="defaults-as-flag"
+        ),
+        pytest.param(_cmd_varargs, "", R(out="\n", err=""), id="varargs-none"),
+        pytest.param(_cmd_varargs, "foo", R(out="foo\n", err=""), id="varargs-one"),
+        pytest.param(
+            _cmd_varargs, "foo bar", R(out="foo, bar\n", err=""), id="varargs-two"
+        ),
+    ],
+)
+def test_simple_function(cmd, argv, expected):
     p = DebugArghParser()
     p.set_default_command(cmd)
 
-    assert run(p, "") == R(out="foo\n", err="")
-    assert run(p, "bar", exit=True) == "unrecognized arguments: bar"
-    assert run(p, "--x bar") == R(out="bar\n", err="")
-
-
-def test_simple_function_varargs():
-    def func(*file_paths):
-        # `paths` is the single positional argument with nargs='*'
-        yield ", ".join(file_paths)
-
-    p = DebugArghParser()
-    p.set_default_command(func)
-
-    assert run(p, "") == R(out="\n", err="")
-    assert run(p, "foo") == R(out="foo\n", err="")
-    assert run(p, "foo bar") == R(out="foo, bar\n", err="")
+    assert run(p, argv) == expected
 
 
 def test_simple_function_kwargs():
@@ -117,19 +160,19 @@ def test_simple_function_kwargs():
     assert run(p, "hello --bar 123") == R(out="bar: 123\nfoo: hello\n", err="")
 
 
-@pytest.mark.xfail
+@pytest.mark.skip(reason="not implemented")
 def test_simple_function_multiple():
-    raise NotImplementedError
+    pass
 
 
-@pytest.mark.xfail
+@pytest.mark.skip(reason="not implemented")
 def test_simple_function_nested():
-    raise NotImplementedError
+    pass
 
 
-@pytest.mark.xfail
+@pytest.mark.skip(reason="not implemented")
 def test_class_method_as_command():
-    raise NotImplementedError
+    pass
 
 
 def test_all_specs_in_one():
@@ -195,10 +238,11 @@ def test_arg_merged():
     assert "i am made entirely of wood" in help_msg
 
 
-def test_arg_mismatch_positional():
-    """An `@arg('positional')` must match function signature."""
+@pytest.mark.parametrize("flag", ["bogus-argument", "--bogus-argument"])
+def test_arg_mismatch(flag):
+    """An `@arg('positional')` or `@arg('--flag')` must match function signature."""
 
-    @argh.arg("bogus-argument")
+    @argh.arg(flag)
     def confuse_a_cat(vet, funny_things=123):
         return vet, funny_things
 
@@ -207,46 +251,43 @@ def test_arg_mismatch_positional():
         p.set_default_command(confuse_a_cat)
 
     msg = (
-        "confuse_a_cat: argument bogus-argument does not fit "
+        f"confuse_a_cat: argument {flag} does not fit "
         "function signature: vet, -f/--funny-things"
     )
-    assert msg in str(excinfo.value)
+    assert excinfo.value.args == (msg,)
 
 
-def test_arg_mismatch_flag():
-    """An `@arg('--flag')` must match function signature."""
+def test_arg_mismatch_positional_vs_flag():
+    """An `@arg('arg')` must match a positional arg in function signature."""
 
-    @argh.arg("--bogus-argument")
-    def confuse_a_cat(vet, funny_things=123):
-        return vet, funny_things
+    @argh.arg("foo")
+    def func(foo=123):
+        return foo
 
     p = DebugArghParser("PROG")
     with pytest.raises(AssemblingError) as excinfo:
-        p.set_default_command(confuse_a_cat)
+        p.set_default_command(func)
 
     msg = (
-        "confuse_a_cat: argument --bogus-argument does not fit "
-        "function signature: vet, -f/--funny-things"
+        'func: argument "foo" declared as optional (in function signature)'
+        " and positional (via decorator)"
     )
     assert msg in str(excinfo.value)
 
 
-def test_arg_mismatch_positional_vs_flag():
-    """An `@arg('arg')` must match a positional arg in function signature."""
+def test_arg_invalid_option_string():
+    """A malformed `@arg('-f', 'foo')` is reported as such."""
 
-    @argh.arg("foo")
-    def func(foo=123):
+    @argh.arg("-f", "foo")
+    def func(foo=1):
         return foo
 
     p = DebugArghParser("PROG")
     with pytest.raises(AssemblingError) as excinfo:
         p.set_default_command(func)
 
-    msg = (
-        'func: argument "foo" declared as optional (in function signature)'
-        " and positional (via decorator)"
-    )
-    assert msg in str(excinfo.value)
+    msg = "func: invalid option string 'foo': must start with a character '-'"
+    assert excinfo.value.args == (msg,)
 
 
 def test_arg_mismatch_flag_vs_positional():
@@ -269,6 +310,8 @@ def test_arg_mismatch_flag_vs_positional():
 
 class TestErrorWrapping:
     def _get_parrot(self):
+        # a fresh function per test: ``wrap_errors`` sets attributes on the
+        # function it decorates, so a shared one would leak between tests
         def parrot(dead=False):
             if dead:
                 raise ValueError("this parrot is no more")
@@ -325,20 +368,13 @@ class TestErrorWrapping:
         assert run(p, "b") == R(out="", err="KeyError: 'b'\n", exit=1)
 
 
-def test_argv():
-    def echo(text):
-        return "you said {0}".format(text)
-
+def test_argv(monkeypatch: pytest.MonkeyPatch):
     p = DebugArghParser()
     p.add_commands([echo])
 
-    _argv = sys.argv
-
-    sys.argv = sys.argv[:1] + ["echo", "hi there"]
+    monkeypatch.setattr(sys, "argv", sys.argv[:1] + ["echo", "hi there"])
     assert run(p, None) == R("you said hi there\n", "")
 
-    sys.argv = _argv
-
 
 def test_commands_not_defined():
     p = DebugArghParser()
@@ -410,9 +446,6 @@ def test_unrecognized_arguments():
 def test_echo():
     "A simple command is resolved to a function."
 
-    def echo(text):
-        return "you said {0}".format(text)
-
     p = DebugArghParser()
     p.add_commands([echo])
 
@@ -463,7 +496,7 @@ def test_bare_group_name__deprecated_arg():
     p = DebugArghParser()
     with pytest.warns(
         DeprecationWarning,
-        match=r"Argument `namespace` is deprecated .+ it will be removed in Argh 0\.30",
+        match=_DEPRECATED_NAMESPACE_RE,
     ):
         p.add_commands([hello], namespace="greet")
 
@@ -482,12 +515,6 @@ def test_bare_group_name__deprecated_arg():
 def test_function_under_group_name():
     "A subcommand is resolved to a function."
 
-    def hello(name="world"):
-        return "Hello {0}!".format(name or "world")
-
-    def howdy(buddy):
-        return "Howdy {0}?".format(buddy)
-
     p = DebugArghParser()
     p.add_commands([hello, howdy], group_name="greet")
 
@@ -506,16 +533,10 @@ def test_function_under_group_name():
 def test_namespaced_function__deprecated_arg():
     "A subcommand is resolved to a function."
 
-    def hello(name="world"):
-        return "Hello {0}!".format(name or "world")
-
-    def howdy(buddy):
-        return "Howdy {0}?".format(buddy)
-
     p = DebugArghParser()
     with pytest.warns(
         DeprecationWarning,
-        match=r"Argument `namespace` is deprecated .+ it will be removed in Argh 0\.30",
+        match=_DEPRECATED_NAMESPACE_RE,
     ):
         p.add_commands([hello, howdy], namespace="greet")
 
@@ -541,6 +562,7 @@ def test_explicit_cmd_name():
     assert run(p, "new-name").out == "ok\n"
 
 
+@pytest.mark.skipif(not SUPPORTS_ALIASES, reason="command aliases not supported")
 def test_aliases():
     @argh.aliases("alias2", "alias3")
     def alias1():
@@ -549,10 +571,9 @@ def test_aliases():
     p = DebugArghParser()
     p.add_commands([alias1])
 
-    if argh.assembling.SUPPORTS_ALIASES:
-        assert run(p, "alias1").out == "ok\n"
-        assert run(p, "alias2").out == "ok\n"
-        assert run(p, "alias3").out == "ok\n"
+    assert run(p, "alias1").out == "ok\n"
+    assert run(p, "alias2").out == "ok\n"
+    assert run(p, "alias3").out == "ok\n"
 
 
 def test_help_alias():
@@ -642,7 +663,9 @@ def test_custom_argparse_namespace():
 
 
 @pytest.mark.parametrize(
-    "argparse_namespace_class", [argparse.Namespace, argh.dispatching.ArghNamespace]
+    "argparse_namespace_class",
+    [argparse.Namespace, argh.dispatching.ArghNamespace],
+    ids=["argparse", "argh"],
 )
 def test_get_function_from_namespace_obj(argparse_namespace_class):
     argparse_namespace = argparse_namespace_class()
@@ -676,10 +699,11 @@ def test_normalized_keys():
     assert run(p, "hello").out == "hello\n"
 
 
-@mock.patch("argh.assembling.COMPLETION_ENABLED", True)
-def test_custom_argument_completer():
+def test_custom_argument_completer(monkeypatch: pytest.MonkeyPatch):
     "Issue #33: Enable custom per-argument shell completion"
 
+    monkeypatch.setattr(argh.assembling, "COMPLETION_ENABLED", True)
+
     @argh.arg("foo", completer="STUB")
     def func(foo):
         pass
@@ -690,26 +714,27 @@ def test_custom_argument_completer():
     assert p._actions[-1].completer == "STUB"
 
 
-def test_class_members():
-    "Issue #34: class members as commands"
+class Controller:
+    var = 123
+
+    def instance_meth(self, value):
+        return value, self.var
 
-    class Controller:
-        var = 123
+    @classmethod
+    def class_meth(cls, value):
+        return value, cls.var
 
-        def instance_meth(self, value):
-            return value, self.var
+    @staticmethod
+    def static_meth(value):
+        return value, "w00t?"
 
-        @classmethod
-        def class_meth(cls, value):
-            return value, cls.var
+    @staticmethod
+    def static_meth2(value):
+        return value, "huh!"
 
-        @staticmethod
-        def static_meth(value):
-            return value, "w00t?"
 
-        @staticmethod
-        def static_meth2(value):
-            return value, "huh!"
+def test_class_members():
+    "Issue #34: class members as commands"
 
     controller = Controller()
 
@@ -743,6 +768,18 @@ def test_kwonlyargs():
     assert run(p, "test --foo=do", exit=True) == message
 
 
+_DEFAULT_HELP_TOKENS = (
+    "Basil",
+    "Moose",
+    "creatures",
+    # explicit help message is not obscured by the implicit one...
+    "remarkable animal",
+    # ...but is still present
+    "it can speak",
+)
+_DEFAULT_HELP_TOKENS_RE = re.compile("|".join(map(re.escape, _DEFAULT_HELP_TOKENS)))
+
+
 def test_default_arg_values_in_help():
     "Argument defaults should appear in the help message implicitly"
 
@@ -759,15 +796,11 @@ def test_default_arg_values_in_help():
 
     p = DebugArghParser()
     p.set_default_command(remind)
+    help_msg = p.format_help()
 
-    assert "Basil" in p.format_help()
-    assert "Moose" in p.format_help()
-    assert "creatures" in p.format_help()
-
-    # explicit help message is not obscured by the implicit one...
-    assert "remarkable animal" in p.format_help()
-    # ...but is still present
-    assert "it can speak" in p.format_help()
+    # a single pass over the help message; comparing sets (rather than
+    # counting matches) still reports exactly which tokens are missing
+    assert set(_DEFAULT_HELP_TOKENS_RE.findall(help_msg)) == set(_DEFAULT_HELP_TOKENS)
 
 
 def test_default_arg_values_in_help__regression():
@@ -780,10 +813,10 @@ def test_default_arg_values_in_help__regression():
     p.set_default_command(foo)
 
     # doesn't break
-    p.format_help()
+    help_msg = p.format_help()
 
     # now check details
-    assert "-b BAR, --bar BAR  ''" in p.format_help()
+    assert "-b BAR, --bar BAR  ''" in help_msg
     # note the empty str repr ^^^
 
 
@@ -808,7 +841,7 @@ def test_help_formatting_is_preserved():
     assert func.__doc__ in p.format_help()
 
 
-def test_prog(capsys: pytest.CaptureFixture[str]):
+def test_prog():
     "Program name propagates from sys.argv[0]"
 
     def cmd(foo=1):
@@ -819,9 +852,9 @@ def test_prog(capsys: pytest.CaptureFixture[str]):
 
     usage = get_usage_string()
 
-    assert run(p, "-h", exit=True) == 0
-    captured = capsys.readouterr()
-    assert captured.out.startswith(usage)
+    result = run(p, "-h")
+    assert result.exit == 0
+    assert result.out.startswith(usage)
 
 
 def test_unknown_args():
@@ -840,442 +873,288 @@ def test_unknown_args():
     )
 
 
-def test_add_commands_no_overrides1(capsys: pytest.CaptureFixture[str]):
-    def first_func(foo=123):
-        """Owl stretching time"""
-        pass
+_GROUP_OVERRIDES = {
+    "group_name": "my-group",
+    "group_kwargs": {
+        "help": "group help override",
+        "description": "group description override",
+    },
+}
 
-    def second_func():
-        pass
 
-    p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-    )
-
-    run(p, "--help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp [-h] {{first-func,second-func}} ...
-
-        positional arguments:
-          {{first-func,second-func}}
-            first-func          Owl stretching time
-            second-func
-
-        {HELP_OPTIONS_LABEL}:
-          -h, --help            show this help message and exit
-        """
-        )[1:]
-    )
+_FUNC_OVERRIDES = {
+    "func_kwargs": {
+        "help": "func help override",
+        "description": "func description override",
+    },
+}
 
 
-def test_add_commands_no_overrides2(capsys: pytest.CaptureFixture[str]):
-    def first_func(foo=123):
-        """Owl stretching time"""
-        pass
+def _dedent_help(text):
+    # expected help messages are dedented once, at import time
+    return unindent(text)[1:]
 
-    def second_func():
-        pass
 
+@pytest.fixture(scope="module")
+def myapp_parser(request):
     p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-    )
-
-    run(p, "first-func --help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp first-func [-h] [-f FOO]
+    p.add_commands([first_func, second_func], **request.param)
+    return p
 
-        Owl stretching time
-
-        {HELP_OPTIONS_LABEL}:
-          -h, --help         show this help message and exit
-          -f FOO, --foo FOO  123
-        """
-        )[1:]
-    )
 
-
-def test_add_commands_group_overrides1(capsys: pytest.CaptureFixture[str]):
+@pytest.mark.parametrize(
+    "myapp_parser, argv, expected",
+    [
+        pytest.param(
+            {},
+            "--help",
+            _dedent_help(
+                f"""
+            usage: myapp [-h] {{first-func,second-func}} ...
+
+            positional arguments:
+              {{first-func,second-func}}
+                first-func          Owl stretching time
+                second-func
+
+            {HELP_OPTIONS_LABEL}:
+              -h, --help            show this help message and exit
+            """
+            ),
+            id="no-overrides-1",
+        ),
+        pytest.param(
+            {},
+            "first-func --help",
+            _dedent_help(
+                f"""
+            usage: myapp first-func [-h] [-f FOO]
+
+            Owl stretching time
+
+            {HELP_OPTIONS_LABEL}:
+              -h, --help         show this help message and exit
+              -f FOO, --foo FOO  123
+            """
+            ),
+            id="no-overrides-2",
+        ),
+        pytest.param(
+            _GROUP_OVERRIDES,
+            "--help",
+            _dedent_help(
+                f"""
+            usage: myapp [-h] {{my-group}} ...
+
+            positional arguments:
+              {{my-group}}
+                my-group
+
+            {HELP_OPTIONS_LABEL}:
+              -h, --help  show this help message and exit
+            """
+            ),
+            id="group-overrides-1",
+        ),
+        pytest.param(
+            _GROUP_OVERRIDES,
+            "my-group --help",
+            _dedent_help(
+                f"""
+            usage: myapp my-group [-h] {{first-func,second-func}} ...
+
+            {HELP_OPTIONS_LABEL}:
+              -h, --help            show this help message and exit
+
+            subcommands:
+              group description override
+
+              {{first-func,second-func}}
+                                    group help override
+                first-func          Owl stretching time
+                second-func
+            """
+            ),
+            id="group-overrides-2",
+        ),
+        pytest.param(
+            _GROUP_OVERRIDES,
+            "my-group first-func --help",
+            _dedent_help(
+                f"""
+            usage: myapp my-group first-func [-h] [-f FOO]
+
+            Owl stretching time
+
+            {HELP_OPTIONS_LABEL}:
+              -h, --help         show this help message and exit
+              -f FOO, --foo FOO  123
+            """
+            ),
+            id="group-overrides-3",
+        ),
+        pytest.param(
+            _FUNC_OVERRIDES,
+            "--help",
+            _dedent_help(
+                f"""
+            usage: myapp [-h] {{first-func,second-func}} ...
+
+            positional arguments:
+              {{first-func,second-func}}
+                first-func          func help override
+                second-func         func help override
+
+            {HELP_OPTIONS_LABEL}:
+              -h, --help            show this help message and exit
+            """
+            ),
+            id="func-overrides-1",
+        ),
+        pytest.param(
+            _FUNC_OVERRIDES,
+            "first-func --help",
+            _dedent_help(
+                f"""
+            usage: myapp first-func [-h] [-f FOO]
+
+            func description override
+
+            {HELP_OPTIONS_LABEL}:
+              -h, --help         show this help message and exit
+              -f FOO, --foo FOO  123
+            """
+            ),
+            id="func-overrides-2",
+        ),
+    ],
+    indirect=["myapp_parser"],
+    scope="module",
+)
+def test_add_commands_help(myapp_parser, argv, expected):
     """
-    When `group_kwargs` is passed to `add_commands()`, its members override
-    whatever was specified on function level.
+    Help for commands added by `add_commands()`: without overrides it comes
+    from the functions themselves; members of `group_kwargs` or `func_kwargs`
+    override whatever was specified on function level.
     """
+    assert run(myapp_parser, argv) == R(expected, "", exit=0)
 
-    def first_func(foo=123):
-        """Owl stretching time"""
-        return foo
-
-    def second_func():
-        pass
-
-    p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-        group_name="my-group",
-        group_kwargs={
-            "help": "group help override",
-            "description": "group description override",
-        },
-    )
-
-    run(p, "--help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp [-h] {{my-group}} ...
-
-        positional arguments:
-          {{my-group}}
-            my-group
 
-        {HELP_OPTIONS_LABEL}:
-          -h, --help  show this help message and exit
-        """
-        )[1:]
-    )
-
-
-def test_add_commands_group_overrides2(capsys: pytest.CaptureFixture[str]):
-    """
-    When `group_kwargs` is passed to `add_commands()`, its members override
-    whatever was specified on function level.
+# TODO: remove in v.0.30
+_NS_OVERRIDES = {
+    "namespace": "ns",
+    "namespace_kwargs": {
+        "help": "namespace help override",
+        "description": "namespace description override",
+    },
+}
+_EXPECTED_NS_HELP = _dedent_help(
+    f"""
+    usage: myapp [-h] {{ns}} ...
+
+    positional arguments:
+      {{ns}}
+        ns
+
+    {HELP_OPTIONS_LABEL}:
+      -h, --help  show this help message and exit
     """
+)
 
-    def first_func(foo=123):
-        """Owl stretching time"""
-        return foo
-
-    def second_func():
-        pass
-
-    p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-        group_name="my-group",
-        group_kwargs={
-            "help": "group help override",
-            "description": "group description override",
-        },
-    )
+_EXPECTED_NS_GROUP_HELP = _dedent_help(
+    f"""
+    usage: myapp ns [-h] {{first-func,second-func}} ...
 
-    run(p, "my-group --help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp my-group [-h] {{first-func,second-func}} ...
+    {HELP_OPTIONS_LABEL}:
+      -h, --help            show this help message and exit
 
-        {HELP_OPTIONS_LABEL}:
-          -h, --help            show this help message and exit
+    subcommands:
+      namespace description override
 
-        subcommands:
-          group description override
+      {{first-func,second-func}}
+                            namespace help override
+        first-func          Owl stretching time
+        second-func
+    """
+)
 
-          {{first-func,second-func}}
-                                group help override
-            first-func          Owl stretching time
-            second-func
-        """
-        )[1:]
-    )
+_EXPECTED_NS_FIRST_FUNC_HELP = _dedent_help(
+    f"""
+    usage: myapp ns first-func [-h] [-f FOO]
 
+    Owl stretching time
 
-def test_add_commands_group_overrides3(capsys: pytest.CaptureFixture[str]):
-    """
-    When `group_kwargs` is passed to `add_commands()`, its members override
-    whatever was specified on function level.
+    {HELP_OPTIONS_LABEL}:
+      -h, --help         show this help message and exit
+      -f FOO, --foo FOO  123
     """
+)
 
-    def first_func(foo=123):
-        """Owl stretching time"""
-        return foo
-
-    def second_func():
-        pass
 
+# TODO: remove in v.0.30
+@pytest.fixture(scope="module")
+def ns_parser():
     p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-        group_name="my-group",
-        group_kwargs={
-            "help": "group help override",
-            "description": "group description override",
-        },
-    )
-
-    run(p, "my-group first-func --help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp my-group first-func [-h] [-f FOO]
-
-        Owl stretching time
-
-        {HELP_OPTIONS_LABEL}:
-          -h, --help         show this help message and exit
-          -f FOO, --foo FOO  123
-        """
-        )[1:]
-    )
+    p.add_commands([first_func, second_func], **_NS_OVERRIDES)
+    return p
 
 
 # TODO: remove in v.0.30
-def test_add_commands_group_overrides1__deprecated(capsys: pytest.CaptureFixture[str]):
+def test_add_commands_group_overrides1__deprecated():
     """
     When `namespace_kwargs` is passed to `add_commands()`, its members override
     whatever was specified on function level.
     """
 
-    def first_func(foo=123):
-        """Owl stretching time"""
-        pass
-
-    def second_func():
-        pass
-
     p = argh.ArghParser(prog="myapp")
     with pytest.warns(DeprecationWarning) as recorded_warnings:
-        p.add_commands(
-            [first_func, second_func],
-            namespace="ns",
-            namespace_kwargs={
-                "help": "namespace help override",
-                "description": "namespace description override",
-            },
-        )
+        p.add_commands([first_func, second_func], **_NS_OVERRIDES)
     assert len(recorded_warnings) == 2
-    assert re.match(
-        r".*`namespace` is deprecated .+ removed in Argh 0\.30.+ use `group_name` instead",
-        str(recorded_warnings[0].message),
-    )
-    assert re.match(
-        r".*`namespace_kwargs` is deprecated .+ removed in Argh 0\.30.+ use `group_kwargs` instead",
-        str(recorded_warnings[1].message),
-    )
+    assert _DEPRECATED_NAMESPACE_RE.match(str(recorded_warnings[0].message))
+    assert _DEPRECATED_NAMESPACE_KWARGS_RE.match(str(recorded_warnings[1].message))
 
-    run(p, "--help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp [-h] {{ns}} ...
-
-        positional arguments:
-          {{ns}}
-            ns
-
-        {HELP_OPTIONS_LABEL}:
-          -h, --help  show this help message and exit
-        """
-        )[1:]
-    )
+    assert run(p, "--help") == R(_EXPECTED_NS_HELP, "", exit=0)
 
 
 # TODO: remove in v.0.30
-def test_add_commands_group_overrides2__deprecated(capsys: pytest.CaptureFixture[str]):
+def test_add_commands_group_overrides2__deprecated(ns_parser):
     """
     When `namespace_kwargs` is passed to `add_commands()`, its members override
     whatever was specified on function level.
     """
 
-    def first_func(foo=123):
-        """Owl stretching time"""
-        pass
-
-    def second_func():
-        pass
-
-    p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-        namespace="ns",
-        namespace_kwargs={
-            "help": "namespace help override",
-            "description": "namespace description override",
-        },
-    )
-
-    run(p, "ns --help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp ns [-h] {{first-func,second-func}} ...
-
-        {HELP_OPTIONS_LABEL}:
-          -h, --help            show this help message and exit
-
-        subcommands:
-          namespace description override
-
-          {{first-func,second-func}}
-                                namespace help override
-            first-func          Owl stretching time
-            second-func
-        """
-        )[1:]
-    )
+    assert run(ns_parser, "ns --help") == R(_EXPECTED_NS_GROUP_HELP, "", exit=0)
 
 
 # TODO: remove in v.0.30
-def test_add_commands_group_overrides3__deprecated(capsys: pytest.CaptureFixture[str]):
+def test_add_commands_group_overrides3__deprecated(ns_parser):
     """
     When `namespace_kwargs` is passed to `add_commands()`, its members override
     whatever was specified on function level.
     """
 
-    def first_func(foo=123):
-        """Owl stretching time"""
-        pass
-
-    def second_func():
-        pass
-
-    p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-        namespace="ns",
-        namespace_kwargs={
-            "help": "namespace help override",
-            "description": "namespace description override",
-        },
-    )
-
-    run(p, "ns first-func --help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp ns first-func [-h] [-f FOO]
-
-        Owl stretching time
-
-        {HELP_OPTIONS_LABEL}:
-          -h, --help         show this help message and exit
-          -f FOO, --foo FOO  123
-        """
-        )[1:]
-    )
-
-
-def test_add_commands_func_overrides1(capsys: pytest.CaptureFixture[str]):
-    """
-    When `func_kwargs` is passed to `add_commands()`, its members override
-    whatever was specified on function level.
-    """
-
-    def first_func(foo=123):
-        """Owl stretching time"""
-        pass
-
-    def second_func():
-        pass
-
-    p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-        func_kwargs={
-            "help": "func help override",
-            "description": "func description override",
-        },
-    )
-
-    run(p, "--help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp [-h] {{first-func,second-func}} ...
-
-        positional arguments:
-          {{first-func,second-func}}
-            first-func          func help override
-            second-func         func help override
-
-        {HELP_OPTIONS_LABEL}:
-          -h, --help            show this help message and exit
-        """
-        )[1:]
-    )
-
-
-def test_add_commands_func_overrides2(capsys: pytest.CaptureFixture[str]):
-    """
-    When `func_kwargs` is passed to `add_commands()`, its members override
-    whatever was specified on function level.
-    """
-
-    def first_func(foo=123):
-        """Owl stretching time"""
-        pass
-
-    def second_func():
-        pass
-
-    p = argh.ArghParser(prog="myapp")
-    p.add_commands(
-        [first_func, second_func],
-        func_kwargs={
-            "help": "func help override",
-            "description": "func description override",
-        },
+    assert run(ns_parser, "ns first-func --help") == R(
+        _EXPECTED_NS_FIRST_FUNC_HELP, "", exit=0
     )
 
-    run(p, "first-func --help", exit=True)
-    captured = capsys.readouterr()
-    assert (
-        captured.out
-        == unindent(
-            f"""
-        usage: myapp first-func [-h] [-f FOO]
 
-        func description override
+@argh.arg("-v", "--verbose", action="count", default=0)
+def _count_only_arg_decorator(**kwargs):
+    verbosity = kwargs.get("verbose")
+    return f"verbosity: {verbosity}"
 
-        {HELP_OPTIONS_LABEL}:
-          -h, --help         show this help message and exit
-          -f FOO, --foo FOO  123
-        """
-        )[1:]
-    )
 
+@argh.arg("-v", "--verbose", action="count")
+def _count_mixed(verbose=0):
+    return f"verbosity: {verbose}"
 
-def test_action_count__only_arg_decorator():
-    @argh.arg("-v", "--verbose", action="count", default=0)
-    def func(**kwargs):
-        verbosity = kwargs.get("verbose")
-        return f"verbosity: {verbosity}"
-
-    p = DebugArghParser()
-    p.set_default_command(func)
-
-    assert run(p, "").out == "verbosity: 0\n"
-    assert run(p, "-v").out == "verbosity: 1\n"
-    assert run(p, "-vvvv").out == "verbosity: 4\n"
-
-
-def test_action_count__mixed():
-    @argh.arg("-v", "--verbose", action="count")
-    def func(verbose=0):
-        return f"verbosity: {verbose}"
 
+@pytest.mark.parametrize(
+    "func",
+    [_count_only_arg_decorator, _count_mixed],
+    ids=["only_arg_decorator", "mixed"],
+)
+def test_action_count(func):
     p = DebugArghParser()
     p.set_default_command(func)
 
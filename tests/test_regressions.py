@@ -148,3 +148,21 @@ def test_regression_issue104():
     p.set_default_command(cmd)
     expected = "abc\ndef\n8\n9\n{}\n"
     assert run(p, "abc def --baz-baz 8").out == expected
+
+
+def test_regression_underscore_prefixed_keyword_argument():
+    """
+    A keyword argument whose name starts with an underscore must be rejected
+    when the parser is assembled.
+
+    :Reason: the underscore in the inferred short flag was not replaced with
+        a dash, so ``_x=1`` produced a parser with ``-_ X, ---x X`` that
+        stored the value under a different name and failed on dispatch.
+    """
+
+    def cmd(_x=1):
+        return _x
+
+    p = DebugArghParser()
+    with pytest.raises(argh.AssemblingError, match="cannot add --/---x"):
+        p.set_default_command(cmd)
@@ -5,7 +5,7 @@ Unit Tests For Utility Functions
 """
 import functools
 
-from argh.utils import get_arg_spec, unindent
+from argh.utils import clear_arg_spec_cache, get_arg_spec, get_cached_arg_spec, unindent
 
 
 def function(x, y=0):
@@ -95,6 +95,18 @@ def test_get_arg_spec__method():
     _assert_spec(C.func, args=["self", "x", "y"])
 
 
+def test_get_cached_arg_spec():
+    def func(x, y=0):
+        return x
+
+    spec = get_cached_arg_spec(func)
+    assert spec == get_arg_spec(func)
+    assert get_cached_arg_spec(func) is spec
+
+    clear_arg_spec_cache()
+    assert get_cached_arg_spec(func) is not spec
+
+
 def test_util_unindent():
     "Self-test the unindent() helper function"
 